@@ -1,8 +1,18 @@
 import os           # File system path resolution
 import time         # Time measurement for statistic collection
 import calendar     # Calendar month and day information
+import concurrent.futures  # Concurrent statistic calculation
 import datetime     # Date utilities
+import itertools    # Iterator slicing
+import numpy        # Vectorized array operations
 import pandas       # Numerical analysis and csv import
+import pyarrow      # Memory mapped file access
+import pyarrow.ipc  # Arrow IPC cache of parsed data
+
+try:
+    import numba    # Optional JIT compilation of counting loops
+except ImportError:
+    numba = None
 
 
 # Filenames and path of script execution
@@ -12,6 +22,22 @@ chicago = 'chicago.csv'
 new_york_city = 'new_york_city.csv'
 washington = 'washington.csv'
 
+# Version of the parsed data cached beside each CSV file. Bump whenever open_file changes
+# the stored columns or their dtypes, so caches written by older versions are not reused
+cache_version = 2
+
+# Data file for each city name the user may enter
+city_files = {'chicago': chicago, 'new york': new_york_city, 'washington': washington}
+
+# Month lengths and names of the months covered by the data, indexed by 1-indexed month
+# scope document defines all data as being January through June of 2017
+days_in_month = (0, 31, 28, 31, 30, 31, 30)
+month_names = ('', 'January', 'February', 'March', 'April', 'May', 'June')
+months = {'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6}
+
+# Answers accepted when asking whether to display individual trip data
+display_answers = {'yes': True, 'no': False}
+
 
 def get_city_filename():
     '''Prompts user for a city and returns the fully qualified filename and path for that city's bike share data.
@@ -24,14 +50,10 @@ def get_city_filename():
 
     while True:
         city = input('Which city would you like to view? (\'Chicago\', \'New York\', or \'Washington\'): ')
-        city = city.lower()
-
-        if city == 'chicago':
-            return os.path.join(file_path, chicago)
-        elif city == 'new york':
-            return os.path.join(file_path, new_york_city)
-        elif city == 'washington':
-            return os.path.join(file_path, washington)
+        city_file = city_files.get(city.lower())
+
+        if city_file is not None:
+            return os.path.join(file_path, city_file)
         else:
             print('An invalid city was entered.\n')
 
@@ -42,16 +64,80 @@ def open_file(file_path: str):
     Args:
         file_path (str): The fully qualified file name and path of the CSV file containing city data
     Returns:
-        DataFrame: A Pandas DataFrame with columns matching the provided CSV file
+        DataFrame: A Pandas DataFrame with columns matching the provided CSV file, with Start and End
+                   Station as categoricals sharing one set of stations, plus derived int8 columns
+                   _month, _weekday (Monday == 0) and _hour of the start time
     '''
 
-    data = pandas.read_csv(filepath_or_buffer=file_path,
-                           sep=',',
-                           header=0,
-                           parse_dates=[0,1],
-                           index_col=0,
-                           memory_map=True)
-    
+    # Parsed data is cached beside the CSV file as an Arrow IPC file; reuse it unless the CSV
+    # has changed since. Memory mapping lets a warm reload read straight from the page cache
+    cache_path = '{0}.v{1}.arrow'.format(file_path, cache_version)
+    # An unreadable cache is ignored and rebuilt from the CSV file
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(file_path):
+        try:
+            with pyarrow.memory_map(cache_path, 'r') as source:
+                table = pyarrow.ipc.open_file(source).read_all()
+            return table.to_pandas(self_destruct=True)
+        except (OSError, pyarrow.ArrowException):
+            pass
+
+    # Read through a large buffer rather than memory mapping, which on a cold page cache
+    # stalls on a page fault per block; where supported, hint that the read is sequential
+    with open(file_path, 'rb', buffering=1 << 20) as csv_file:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(csv_file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        # Arrow's multi-threaded CSV reader with an explicit schema for the text columns;
+        # low cardinality columns are read as categoricals
+        data = pandas.read_csv(filepath_or_buffer=csv_file,
+                               sep=',',
+                               header=0,
+                               engine='pyarrow',
+                               parse_dates=['Start Time', 'End Time'],
+                               index_col=0,
+                               dtype={'Start Station': 'string[pyarrow]',
+                                      'End Station': 'string[pyarrow]',
+                                      'User Type': 'category',
+                                      'Gender': 'category'})
+
+    # Narrow the numeric columns to the smallest types that hold them, so reductions
+    # read fewer bytes. Birth Year uses a nullable integer to keep missing values
+    duration = data['Trip Duration']
+    if (duration.dtype.kind == 'i'
+            and numpy.iinfo(numpy.int32).min <= duration.min()
+            and duration.max() <= numpy.iinfo(numpy.int32).max):
+        data['Trip Duration'] = duration.astype('int32')
+    if 'Birth Year' in data:
+        data['Birth Year'] = data['Birth Year'].astype('Int16')
+
+    # Start and End Station share one categorical dictionary, so a station has the
+    # same integer code in both columns
+    stations = pandas.Index(data['Start Station'].unique()).union(pandas.Index(data['End Station'].unique()))
+    stations = pandas.CategoricalDtype(stations.dropna())
+    data['Start Station'] = data['Start Station'].astype(stations)
+    data['End Station'] = data['End Station'].astype(stations)
+
+    # Start time components used by the statistics, computed once per load
+    # rather than re-derived from the datetime column by every function
+    data['_month'] = data['Start Time'].dt.month.astype('int8')
+    data['_weekday'] = data['Start Time'].dt.weekday.astype('int8')
+    data['_hour'] = data['Start Time'].dt.hour.astype('int8')
+
+    # Caching is best effort: skip it if the directory is read-only or the data cannot be
+    # converted to Arrow. The cache is written to a
+    # temporary file and moved into place, so an interrupted write never leaves a partial cache
+    temp_path = '{0}.{1}.tmp'.format(cache_path, os.getpid())
+    try:
+        table = pyarrow.Table.from_pandas(data)
+        with pyarrow.OSFile(temp_path, 'wb') as sink, pyarrow.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(temp_path, cache_path)
+    except (OSError, pyarrow.ArrowException):
+        pass
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
     return data
 
 
@@ -62,11 +148,38 @@ def filter_city_data(city_data, time_period):
         city_data (DataFrame): A Pandas DataFrame of city data
         time_period (dict): Specifies Year, Month, Day (inclusive) to filter city_data 
     Returns:
-        DataFrame: A Pandas DataFrame including rows having a 'Start Time' within the time_period 
+        ndarray: Boolean mask selecting the rows having a 'Start Time' within the time_period
     '''
-    # filter city_data to dates included within time_period
-    return city_data[(city_data['Start Time'].dt.date >= datetime.date(time_period['year'], time_period['month'], time_period['day'][0]))
-                        & (city_data['Start Time'].dt.date <= datetime.date(time_period['year'], time_period['month'], time_period['day'][1]))]
+    start_times = city_data['Start Time'].values
+    unit = 'datetime64[{0}]'.format(numpy.datetime_data(start_times.dtype)[0])
+
+    # Half-open [first day, day after last day) bounds, so whole days are included. Bounds are
+    # converted once to the column's own time unit so both sides compare as plain int64
+    lower = numpy.datetime64(datetime.date(time_period['year'], time_period['month'], time_period['day'][0]))
+    upper = lower + numpy.timedelta64(time_period['day'][1] - time_period['day'][0] + 1, 'D')
+    lower = lower.astype(unit).astype(numpy.int64)
+    upper = upper.astype(unit).astype(numpy.int64)
+
+    start_times = start_times.view(numpy.int64)
+    return (start_times >= lower) & (start_times < upper)
+
+
+def filtered_column(city_file, column, mask):
+    '''Returns a single column of city data limited to the rows selected by mask. Only the
+    requested column is copied, rather than every column of the DataFrame.
+
+    Args:
+        city_file: Pandas DataFrame of city data
+        column (str): Name of the column
+        mask (ndarray): Boolean row selection from filter_city_data, or None for all rows
+    Returns:
+        Series: A Pandas Series of the selected rows of column
+    '''
+
+    if mask is None:
+        return city_file[column]
+
+    return city_file[column][mask]
 
 
 def get_time_period():
@@ -85,8 +198,7 @@ def get_time_period():
 
         if time_period == 'month':
             m = get_month()
-            last_day_of_month = calendar.monthrange(2017, m)[1]
-            return {'period': 'month', 'year': 2017, 'month': m, 'day': [1, last_day_of_month]}
+            return {'period': 'month', 'year': 2017, 'month': m, 'day': [1, days_in_month[m]]}
         elif time_period == 'day':
             m = get_month()
             d = get_day(m)
@@ -107,14 +219,12 @@ def get_month():
         (int): 1-indexed calendar month value
     '''
 
-    valid_months = ['january', 'february', 'march', 'april', 'may', 'june']
-
     while True:
         month = input('\nWhich month? January, February, March, April, May, or June? ')
-        month = month.lower()
+        month = months.get(month.lower())
 
-        if month in valid_months:
-            return valid_months.index(month) + 1
+        if month is not None:
+            return month
         else:
             print('An invalid month was entered.\n')
 
@@ -131,8 +241,8 @@ def get_day(month):
 
     # Get last valid day number of given month
     # scope document defines all data as being in year 2017
-    month_year = calendar.month_name[month] + ' 2017'
-    last_day_of_month = calendar.monthrange(2017, month)[1]
+    month_year = month_names[month] + ' 2017'
+    last_day_of_month = days_in_month[month]
     day_range = '[1...{}]'.format(last_day_of_month)
 
     while True:
@@ -150,77 +260,94 @@ def get_day(month):
             print('An invalid day was entered.\n')
 
 
-def popular_month(city_file):
+def popular_month(city_file, mask=None):
     '''Answer question: What is the most popular month for start time?
     
     Args:
         city_file: Pandas DataFrame of city data
+        mask (ndarray): Boolean row selection from filter_city_data, or None for all rows
     Returns:
         (tuple): [0]: Calendar month name of start time
                  [1]: Number of times month appears in start time
     '''
     
-    # Pandas Series in descending order, counting occurrences of unique values
-    month_values = city_file['Start Time'].dt.month.value_counts()
-    
-    # Get readable calendar name and number of occurrences from 0th position
-    return (calendar.month_name[month_values.index[0]], month_values.iloc[0])
+    # Occurrences of each month number; index 0 is unused
+    month_values = numpy.bincount(filtered_column(city_file, '_month', mask).values, minlength=13)
+    month = month_values.argmax()
 
+    # Get readable calendar name and number of occurrences
+    return (calendar.month_name[month], int(month_values[month]))
 
-def popular_day(city_file):
+
+def popular_day(city_file, mask=None):
     '''Answer question: What is the most popular day of week (Monday, Tuesday, etc.) for start time?
     
     Args:
         city_file: Pandas DataFrame of city data
+        mask (ndarray): Boolean row selection from filter_city_data, or None for all rows
     Returns:
         (tuple): [0]: Calendar day name of start time
                 [1]: Number of times day appears in start time
     '''
 
-    # Pandas Series in descending order, counting occurrences of unique values
-    day_values = city_file['Start Time'].dt.weekday.value_counts()
-    
-    # Get readable calendar name and number of occurrences from 0th position
-    return (calendar.day_name[day_values.index[0]], day_values.iloc[0])
+    # Occurrences of each weekday number, Monday == 0
+    day_values = numpy.bincount(filtered_column(city_file, '_weekday', mask).values, minlength=7)
+    day = day_values.argmax()
 
+    # Get readable calendar name and number of occurrences
+    return (calendar.day_name[day], int(day_values[day]))
 
-def popular_hour(city_file):
+
+def popular_hour(city_file, mask=None):
     '''Answer question: What is the most popular hour of day for start time?
     
     Args:
         city_file: Pandas DataFrame of city data
+        mask (ndarray): Boolean row selection from filter_city_data, or None for all rows
     Returns:
         (tuple): [0]: Hour number (24-hour format) of start time
                  [1]: Number of times hour appears in start time
     '''
 
-    # Pandas Series in descending order, counting occurrences of unique values
-    hour_values = city_file['Start Time'].dt.hour.value_counts()
-    
+    # Occurrences of each hour of day
+    hour_values = numpy.bincount(filtered_column(city_file, '_hour', mask).values, minlength=24)
+    hour = hour_values.argmax()
+
     # Hour and number of occurrences
-    return (hour_values.index[0], hour_values.iloc[0])
+    return (int(hour), int(hour_values[hour]))
 
 
-def trip_duration(city_file):
+def trip_duration(city_file, mask=None):
     '''Answer question: What is the total trip duration and average trip duration? Return in precision of minutes.
     
     Args:
         city_file: Pandas DataFrame of city data
+        mask (ndarray): Boolean row selection from filter_city_data, or None for all rows
     Returns:
         (dict): {total: int, mean: float}
                 total: sum of trips
                 mean: arithmetic mean of trips
     '''
 
-    return {'total': city_file['Trip Duration'].sum(),
-            'mean': city_file['Trip Duration'].mean()}
+    duration = filtered_column(city_file, 'Trip Duration', mask).values
 
+    # One reduction for both values; integer durations accumulate in int64 to avoid overflow
+    if duration.dtype.kind == 'f':
+        duration = duration[~numpy.isnan(duration)]
+        total = duration.sum()
+    else:
+        total = duration.sum(dtype=numpy.int64)
+
+    return {'total': total,
+            'mean': total / len(duration)}
 
-def popular_stations(city_file):
+
+def popular_stations(city_file, mask=None):
     '''Answer question: What is the most popular start station and most popular end station?
     
     Args:
         city_file: Pandas DataFrame of city data
+        mask (ndarray): Boolean row selection from filter_city_data, or None for all rows
     Returns:
         (dict): {start: (str, int), end: (str, int)}
                 start: most popular starting station
@@ -231,93 +358,261 @@ def popular_stations(city_file):
                     [1]: Number of occurrences
     '''
 
-    # Number of unique occurrences
-    start = city_file['Start Station'].value_counts()
-    end = city_file['End Station'].value_counts()
+    # Both columns share one station dictionary, so count codes directly into
+    # arrays of the same length; missing stations (code -1) are skipped
+    stations = city_file['Start Station'].cat.categories
+    start = filtered_column(city_file, 'Start Station', mask).cat.codes.values
+    end = filtered_column(city_file, 'End Station', mask).cat.codes.values
+    start = numpy.bincount(start[start >= 0], minlength=len(stations))
+    end = numpy.bincount(end[end >= 0], minlength=len(stations))
+    start_station = start.argmax()
+    end_station = end.argmax()
+
+    return {'start': (stations[start_station], int(start[start_station])),
+            'end': (stations[end_station], int(end[end_station]))}
+
+
+def station_pair_mode(start, end, table_size):
+    '''Finds the most frequent (start, end) station code pair in a single pass, counting pairs
+    in an open addressing hash table. Compiled with Numba when it is installed.
+
+    Args:
+        start (ndarray): Start station category codes, -1 for missing
+        end (ndarray): End station category codes, -1 for missing
+        table_size (int): Hash table slots, a power of two larger than the number of distinct pairs
+    Returns:
+        (tuple): [0]: Pair key, start code in the high 32 bits and end code in the low 32 bits
+                 [1]: Number of occurrences of the pair
+    '''
+
+    keys = numpy.full(table_size, -1, numpy.int64)
+    counts = numpy.zeros(table_size, numpy.int64)
+    best_key = -1
+    best_count = 0
+
+    for i in range(start.shape[0]):
+        if start[i] < 0 or end[i] < 0:
+            continue
+
+        key = (numpy.int64(start[i]) << 32) | numpy.int64(end[i])
+
+        # Linear probe from a mixed hash of the key (MurmurHash3 finalizer constant)
+        slot = (key ^ (key >> 33)) * -49064778989728563
+        slot = (slot ^ (slot >> 33)) & (table_size - 1)
+        while keys[slot] != -1 and keys[slot] != key:
+            slot = (slot + 1) & (table_size - 1)
 
-    return {'start': (start.index[0], start.iloc[0]),
-            'end': (end.index[0], end.iloc[0])}
+        keys[slot] = key
+        counts[slot] += 1
+        if counts[slot] > best_count:
+            best_key = key
+            best_count = counts[slot]
 
+    return best_key, best_count
 
-def popular_trip(city_file):
+
+if numba is not None:
+    station_pair_mode = numba.njit(cache=True, nogil=True)(station_pair_mode)
+
+
+def popular_trip(city_file, mask=None):
     '''Answer question: What is the most popular trip?
     
     Args:
         city_file: Pandas DataFrame of city data
+        mask (ndarray): Boolean row selection from filter_city_data, or None for all rows
     Returns:
         (tuple): (str, int)
                     [0]: 'Start Station' to 'End Station', expressed as a string
                     [1]: Number of trips between the stations
     '''
-    trip = (city_file.groupby(['Start Station', 'End Station'])
-                     .size()
-                     .sort_values(ascending=False)
-                     .reset_index(name='count'))
+    stations = city_file['Start Station'].cat.categories
+    start = filtered_column(city_file, 'Start Station', mask).cat.codes.values
+    end = filtered_column(city_file, 'End Station', mask).cat.codes.values
+
+    if numba is not None:
+        # Enough slots to keep the table at most half full, whatever the station count
+        pairs = min(len(start), len(stations) ** 2)
+        trip, count = station_pair_mode(start, end, 1 << (2 * pairs).bit_length())
+        start, end = trip >> 32, trip & 0xFFFFFFFF
+    else:
+        # Drop trips with a missing station (code -1), then count each station pair
+        # under a single integer key instead of grouping on the two string columns
+        known = (start >= 0) & (end >= 0)
+        trips, counts = numpy.unique(start[known].astype(numpy.int64) * len(stations) + end[known],
+                                     return_counts=True)
+        trip = counts.argmax()
+        start, end = divmod(trips[trip], len(stations))
+        count = counts[trip]
 
-    return (trip['Start Station'][0] + ' to ' + trip['End Station'][0], trip['count'][0])
+    return ('{0} to {1}'.format(stations[start], stations[end]), int(count))
 
 
-def users(city_file):
+def users(city_file, mask=None):
     '''Answer question: What are the counts of each user type?
     
     Args:
         city_file: Pandas DataFrame of city data
+        mask (ndarray): Boolean row selection from filter_city_data, or None for all rows
     Returns:
         Series: A Pandas Series with User Types and unique counts of occurrences
     '''
-    return city_file['User Type'].value_counts().reset_index()
+    # Categorical counts include every category; list only those present in the rows
+    counts = filtered_column(city_file, 'User Type', mask).value_counts()
+    return counts[counts > 0].reset_index()
 
 
-def gender(city_file):
+def gender(city_file, mask=None):
     '''Answer question: What are the counts of gender?
     
     Args:
         city_file: Pandas DataFrame of city data
+        mask (ndarray): Boolean row selection from filter_city_data, or None for all rows
     Returns:
         Series: A Pandas Series with Genders and unique counts of occurrences
     '''
-    return city_file['Gender'].value_counts().reset_index()
+    # Categorical counts include every category; list only those present in the rows
+    counts = filtered_column(city_file, 'Gender', mask).value_counts()
+    return counts[counts > 0].reset_index()
+
+
+def birth_year_stats(years, missing):
+    '''Finds the lowest, highest and most frequent birth year in a single pass, skipping missing
+    values. Compiled with Numba when it is installed.
+
+    Args:
+        years (ndarray): Integer birth years
+        missing (ndarray): Boolean, True where the birth year is missing
+    Returns:
+        (tuple): [0]: Number of birth years present; when 0 the other values are meaningless
+                 [1]: Lowest birth year
+                 [2]: Highest birth year
+                 [3]: Most frequent birth year among years 1800 through 2099, -1 if none is in that range
+    '''
+
+    present = 0
+    oldest = numpy.iinfo(numpy.int64).max
+    youngest = numpy.iinfo(numpy.int64).min
+    counts = numpy.zeros(300, numpy.int64)
+
+    for i in range(years.shape[0]):
+        if missing[i]:
+            continue
+
+        year = numpy.int64(years[i])
+        present += 1
 
+        if year < oldest:
+            oldest = year
+        if year > youngest:
+            youngest = year
 
-def birth_years(city_file):
+        # Counts cover a fixed window of years, wide enough for any plausible rider
+        if 0 <= year - 1800 < counts.shape[0]:
+            counts[year - 1800] += 1
+
+    mode = counts.argmax() + 1800 if counts.max() > 0 else -1
+
+    return present, oldest, youngest, mode
+
+
+if numba is not None:
+    birth_year_stats = numba.njit(cache=True, nogil=True)(birth_year_stats)
+
+
+def birth_years(city_file, mask=None):
     '''Answer question: What are the earliest (i.e. oldest user), most recent (i.e. youngest user),
     and most popular birth years?
     
     Args:
         city_file: Pandas DataFrame of city data
+        mask (ndarray): Boolean row selection from filter_city_data, or None for all rows
     Returns:
         (dict): {oldest: int, youngest: int, mode: int}
                     oldest: The lowest numeric birth year
                     youngest: The highest numeric birth year
                     mode: The arithmetic mode (most frequently occurring) birth year
+        None if no birth years are present in the selected rows
     '''
-    return {'oldest': int(city_file['Birth Year'].min()),
-            'youngest': int(city_file['Birth Year'].max()),
-            'mode': int(city_file['Birth Year'].value_counts().index[0])}
+    birth_year = filtered_column(city_file, 'Birth Year', mask)
+
+    if numba is not None:
+        # Pass the nullable integer array's own values and missing-value mask, so the kernel
+        # is the only sweep over the column
+        present, oldest, youngest, mode = birth_year_stats(birth_year.array._data, birth_year.array._mask)
+        if present == 0:
+            return None
+
+        # No year inside the kernel's counting window; take the mode from pandas instead
+        if mode < 0:
+            mode = birth_year.value_counts(sort=False).idxmax()
 
+        return {'oldest': int(oldest),
+                'youngest': int(youngest),
+                'mode': int(mode)}
 
-def display_tabular_data(city_file):
+    if birth_year.count() == 0:
+        return None
+
+    return {'oldest': int(birth_year.min()),
+            'youngest': int(birth_year.max()),
+            'mode': int(birth_year.value_counts(sort=False).idxmax())}
+
+
+def display_tabular_data(city_file, mask=None):
     '''Displays five lines of data. After displaying five lines, ask the user if they would like to see five more,
     continuing asking until they say stop.
 
     Args:
-        none.
+        city_file: Pandas DataFrame of city data
+        mask (ndarray): Boolean row selection from filter_city_data, or None for all rows
     Returns:
         none.
     '''
 
     x = 5   # number of rows to display per pass
-    i = 0   # counter for current start row
-    rows, cols = city_file.shape
+
+    # Hide the derived columns added by open_file
+    columns = [c for c in city_file.columns if not c.startswith('_')]
+
+    # Cell formatting and column widths are fixed once up front. Floats print at a fixed
+    # precision, as to_string does; categories and datetimes have a known width, and other
+    # numbers are as wide as the longer of their formatted extremes
+    formats = []
+    widths = []
+    for column in columns:
+        dtype = city_file[column].dtype
+        cell = '{:.6f}'.format if dtype.kind == 'f' else str
+        if isinstance(dtype, pandas.CategoricalDtype):
+            width = max((len(str(c)) for c in dtype.categories), default=0)
+        elif dtype.kind == 'M':
+            width = len('YYYY-MM-DD HH:MM:SS')
+        else:
+            low, high = city_file[column].min(), city_file[column].max()
+            width = 0 if pandas.isna(low) else max(len(cell(low)), len(cell(high)))
+        formats.append(cell)
+        widths.append(max(width, len(column)))
+
+    row_format = ' '.join('{:<%d}' % width for width in widths)
+    header = row_format.format(*columns)
+
+    # Single pass iterator over the selected rows, as tuples of column values
+    rows = zip(*(filtered_column(city_file, column, mask) for column in columns))
 
     print('\nUser trip details:')
     while True:
-        # Print x rows in the range 
-        # print(tabulate(city_file[i:i+x], headers='keys', showindex=False, tablefmt='psql'))
-        print(city_file[i:i+x].to_string(index=False, na_rep='', justify='left'))
-        i = i + x
-        
-        if i > rows:
+        # Print next x rows
+        chunk = list(itertools.islice(rows, x))
+        if not chunk:
+            print('End of trip details file.\n')
+            break
+
+        print(header)
+        for row in chunk:
+            print(row_format.format(*('' if pandas.isna(value) else cell(value)
+                                      for cell, value in zip(formats, row))))
+
+        if len(chunk) < x:
             print('End of trip details file.\n')
             break
 
@@ -342,16 +637,30 @@ def display_data():
 
     while True:
         display = input('\nView individual trip data? (\'yes\' or \'no\').\n')
-        display = display.lower()
+        display = display_answers.get(display.lower())
 
-        if display == 'yes':
-            return True
-        elif display == 'no':
-            return False
+        if display is not None:
+            return display
         else:
             print('An invalid response was entered.\n')
 
 
+def timed(function, *args):
+    '''Calls function with args and measures how long it took.
+
+    Args:
+        function: The function to call
+        *args: Arguments passed to function
+    Returns:
+        (tuple): [0]: Value returned by function
+                 [1]: Elapsed time in seconds
+    '''
+
+    start_time = time.time()
+    result = function(*args)
+    return (result, time.time() - start_time)
+
+
 def statistics():
     '''Calculates and prints out the descriptive statistics about a city and time period
     specified by the user via raw input.
@@ -362,106 +671,134 @@ def statistics():
         none.
     '''
 
-    print('\nHello! Let\'s explore some US bikeshare data!\n')
-
-    # Filter by city (Chicago, New York, Washington)
-    city_file_name = get_city_filename()
+    while True:
+        print('\nHello! Let\'s explore some US bikeshare data!\n')
 
-    # Load city data from file
-    start_time = time.time()
-    city_data = open_file(city_file_name)
-    city_data_elements = [x.lower() for x in city_data]
-    print("Loading data took: {0:.2f} seconds.\n".format(time.time() - start_time))
-    
-    # Prompt to filter by time period (month, day, none), then filter data
-    time_period = get_time_period()
+        # Filter by city (Chicago, New York, Washington)
+        city_file_name = get_city_filename()
 
-    if time_period['period'] == 'month' or time_period['period'] == 'day':
+        # Load city data from file
         start_time = time.time()
-        city_data = filter_city_data(city_data, time_period)
-        print("Filtering data took: {0:.2f} seconds.\n".format(time.time() - start_time))
+        city_data = open_file(city_file_name)
+        city_data_elements = frozenset(column.lower() for column in city_data.columns)
+        print("Loading data took: {0:.2f} seconds.\n".format(time.time() - start_time))
     
-    print('\n=== Statistics ===\n')
-
-    # What is the most popular month for start time?
-    if time_period['period'] == 'none':
-        start_time = time.time()
-        print('{0} is the most popular month: {1} rides.'.format(*popular_month(city_data)))
-        print("({0:.2f} seconds)\n".format(time.time() - start_time))
-
-    # What is the most popular day of week (Monday, Tuesday, etc.) for start time?
-    if time_period['period'] == 'none' or time_period['period'] == 'month':
-        start_time = time.time()
-        print('{0} is the most popular day: {1} rides.'.format(*popular_day(city_data)))
-        print("({0:.2f} seconds)\n".format(time.time() - start_time))
-
-    # What is the most popular hour of day for start time?
-    start_time = time.time()
-    stat_popular_hour = popular_hour(city_data)
-    if stat_popular_hour is not None:
-        print('{0} is the most popular hour: {1} rides.'.format(*stat_popular_hour))
-        print("({0:.2f} seconds)\n".format(time.time() - start_time))
-    else:
-        print('Most popular hour not available in filtered data.\n')
-
-   # What is the total trip duration and average trip duration?
-    start_time = time.time()
-    trip_length = trip_duration(city_data)
-    print('Total trip duration: {0} minutes'.format(trip_length['total']))
-    print('Average trip duration: {0:.2f} minutes'.format(trip_length['mean']))
-    print("({0:.2f} seconds)\n".format(time.time() - start_time))
-
-    # What is the most popular start station and most popular end station?
-    start_time = time.time()
-    popular_station = popular_stations(city_data)
-    print('"{0}" is the most popular starting station: {1} rides.'.format(*popular_station['start']))
-    print('"{0}" is the most popular ending station: {1} rides.'.format(*popular_station['end']))
-    print("({0:.2f} seconds)\n".format(time.time() - start_time))
+        # Prompt to filter by time period (month, day, none), then filter data
+        time_period = get_time_period()
+
+        # Calendar statistics that are meaningful for the period. A month filter leaves a single
+        # month and a day filter a single month and weekday, so those are not computed at all
+        if time_period['period'] == 'none':
+            calendar_stats = {'month': popular_month, 'day': popular_day}
+        elif time_period['period'] == 'month':
+            calendar_stats = {'day': popular_day}
+        else:
+            calendar_stats = {}
+
+        # Rows selected by the filter; None selects every row
+        mask = None
+        if time_period['period'] == 'month' or time_period['period'] == 'day':
+            start_time = time.time()
+            mask = filter_city_data(city_data, time_period)
+            print("Filtering data took: {0:.2f} seconds.\n".format(time.time() - start_time))
     
-    # What is the most popular trip?
-    start_time = time.time()
-    stat_popular_trip = popular_trip(city_data)
-    print('"{0}" is the most popular trip: {1} rides.'.format(*stat_popular_trip))
-    print("({0:.2f} seconds)\n".format(time.time() - start_time))
-
-    # What are the counts of each user type?
-    start_time = time.time()
-    print('User type counts:')
-    # print(tabulate(users(city_data), headers=['User Type', 'Count'], showindex=False, tablefmt='psql'))
-    print(users(city_data).to_string(index=False, header=['User Type', 'Count']))
-    print("({0:.2f} seconds)\n".format(time.time() - start_time))
-
-    # What are the counts of gender?    
-    if 'gender' in city_data_elements:
-        start_time = time.time()
-        print('Gender counts:')
-        #print(tabulate(gender(city_data), headers=['Gender', 'Count'], showindex=False, tablefmt='psql'))
-        print(gender(city_data).to_string(index=False, header=['Gender', 'Count']))
-        print("({0:.2f} seconds)\n".format(time.time() - start_time))
-    else:
-        print('Gender data not available.\n')
+        # Each statistic only reads city_data, so they are computed concurrently. NumPy, pandas
+        # and the Numba kernels release the GIL in their inner loops
+        stats = {}
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            for name, function in calendar_stats.items():
+                stats[name] = executor.submit(timed, function, city_data, mask)
+            stats['hour'] = executor.submit(timed, popular_hour, city_data, mask)
+            stats['trip duration'] = executor.submit(timed, trip_duration, city_data, mask)
+            stats['stations'] = executor.submit(timed, popular_stations, city_data, mask)
+            stats['trip'] = executor.submit(timed, popular_trip, city_data, mask)
+            stats['users'] = executor.submit(timed, users, city_data, mask)
+            if 'gender' in city_data_elements:
+                stats['gender'] = executor.submit(timed, gender, city_data, mask)
+            if 'birth year' in city_data_elements:
+                stats['birth years'] = executor.submit(timed, birth_years, city_data, mask)
+
+        print('\n=== Statistics ===\n')
+
+        # What is the most popular month for start time?
+        if 'month' in stats:
+            stat_popular_month, seconds = stats['month'].result()
+            print('{0} is the most popular month: {1} rides.'.format(*stat_popular_month))
+            print("({0:.2f} seconds)\n".format(seconds))
+
+        # What is the most popular day of week (Monday, Tuesday, etc.) for start time?
+        if 'day' in stats:
+            stat_popular_day, seconds = stats['day'].result()
+            print('{0} is the most popular day: {1} rides.'.format(*stat_popular_day))
+            print("({0:.2f} seconds)\n".format(seconds))
+
+        # What is the most popular hour of day for start time?
+        stat_popular_hour, seconds = stats['hour'].result()
+        if stat_popular_hour is not None:
+            print('{0} is the most popular hour: {1} rides.'.format(*stat_popular_hour))
+            print("({0:.2f} seconds)\n".format(seconds))
+        else:
+            print('Most popular hour not available in filtered data.\n')
+
+       # What is the total trip duration and average trip duration?
+        trip_length, seconds = stats['trip duration'].result()
+        print('Total trip duration: {0} minutes'.format(trip_length['total']))
+        print('Average trip duration: {0:.2f} minutes'.format(trip_length['mean']))
+        print("({0:.2f} seconds)\n".format(seconds))
+
+        # What is the most popular start station and most popular end station?
+        popular_station, seconds = stats['stations'].result()
+        print('"{0}" is the most popular starting station: {1} rides.'.format(*popular_station['start']))
+        print('"{0}" is the most popular ending station: {1} rides.'.format(*popular_station['end']))
+        print("({0:.2f} seconds)\n".format(seconds))
+    
+        # What is the most popular trip?
+        stat_popular_trip, seconds = stats['trip'].result()
+        print('"{0}" is the most popular trip: {1} rides.'.format(*stat_popular_trip))
+        print("({0:.2f} seconds)\n".format(seconds))
+
+        # What are the counts of each user type?
+        stat_users, seconds = stats['users'].result()
+        print('User type counts:')
+        # print(tabulate(stat_users, headers=['User Type', 'Count'], showindex=False, tablefmt='psql'))
+        print(stat_users.to_string(index=False, header=['User Type', 'Count']))
+        print("({0:.2f} seconds)\n".format(seconds))
+
+        # What are the counts of gender?    
+        if 'gender' in stats:
+            stat_gender, seconds = stats['gender'].result()
+            print('Gender counts:')
+            #print(tabulate(stat_gender, headers=['Gender', 'Count'], showindex=False, tablefmt='psql'))
+            print(stat_gender.to_string(index=False, header=['Gender', 'Count']))
+            print("({0:.2f} seconds)\n".format(seconds))
+        else:
+            print('Gender data not available.\n')
+
+        # What are the earliest (i.e. oldest user), most recent (i.e. youngest user), and
+        # most popular birth years?
+        stats_birth_years = None
+        if 'birth years' in stats:
+            stats_birth_years, seconds = stats['birth years'].result()
+
+        if stats_birth_years is not None:
+            print('Oldest birth year: {0}'.format(stats_birth_years['oldest']))
+            print('Newest birth year: {0}'.format(stats_birth_years['youngest']))    
+            print('Most common birth year: {0}'.format(stats_birth_years['mode']))
+            print("({0:.2f} seconds)\n".format(seconds))
+        else:
+            print('Birth year data not available.\n')
 
-    # What are the earliest (i.e. oldest user), most recent (i.e. youngest user), and
-    # most popular birth years?
-    if 'birth year' in city_data_elements:
-        start_time = time.time()
-        stats_birth_years = birth_years(city_data)
-        print('Oldest birth year: {0}'.format(stats_birth_years['oldest']))
-        print('Newest birth year: {0}'.format(stats_birth_years['youngest']))    
-        print('Most common birth year: {0}'.format(stats_birth_years['mode']))
-        print("({0:.2f} seconds)\n".format(time.time() - start_time))
-    else:
-        print('Birth year data not available.\n')
+        # Display five lines of data at a time if user specifies that they would like to
+        if display_data():
+            display_tabular_data(city_data, mask)
 
-    # Display five lines of data at a time if user specifies that they would like to
-    if display_data():
-        display_tabular_data(city_data)
+        # Restart?
+        restart = input('\nWould you like to restart? (\'yes\', or anything else to quit): ')
+        if restart.lower() != 'yes':
+            break
 
-    # Restart?
-    restart = input('\nWould you like to restart? (\'yes\', or anything else to quit): ')
-    if restart.lower() == 'yes':
-        city_data = None
-        statistics()
+        # Release this city's data before the next one is loaded
+        del city_data, mask, stats
 
 
 if __name__ == "__main__":